@@ -0,0 +1,162 @@
+"""Audio helpers built on the ffmpeg and ffprobe command-line tools."""
+
+import subprocess
+from collections.abc import Iterator
+
+# Read size for streaming ffmpeg output
+PIPE_CHUNK_SIZE = 64 * 1024
+
+
+def probe_duration_ms(audio_path: str) -> int:
+    """
+    Get audio duration from the container headers, without decoding.
+
+    Args:
+        audio_path: Path to the audio file
+
+    Returns:
+        Duration in milliseconds
+    """
+    result = subprocess.run(
+        [
+            "ffprobe",
+            "-v", "error",
+            "-show_entries", "format=duration",
+            "-of", "default=nw=1:nk=1",
+            audio_path,
+        ],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    try:
+        return int(float(result.stdout.strip()) * 1000)
+    except ValueError:
+        raise ValueError(f"Cannot determine duration of {audio_path}")
+
+
+def probe_codec(audio_path: str) -> tuple[str, int | None]:
+    """
+    Get the codec and bitrate of the first audio stream from the headers.
+
+    Args:
+        audio_path: Path to the audio file
+
+    Returns:
+        (codec name, bitrate in bits/s or None if unknown)
+    """
+    result = subprocess.run(
+        [
+            "ffprobe",
+            "-v", "error",
+            "-select_streams", "a:0",
+            "-show_entries", "stream=codec_name,bit_rate",
+            "-of", "default=nw=1",
+            audio_path,
+        ],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    fields = dict(
+        line.split("=", 1) for line in result.stdout.splitlines() if "=" in line
+    )
+    bit_rate = fields.get("bit_rate", "")
+    return fields.get("codec_name", ""), int(bit_rate) if bit_rate.isdigit() else None
+
+
+def _segment_cmd(
+    audio_path: str,
+    start_ms: int,
+    duration_ms: int | None,
+    codec_args: list[str],
+) -> list[str]:
+    """Build the ffmpeg command that writes one segment of audio_path to stdout."""
+    cmd = [
+        "ffmpeg",
+        "-nostdin",
+        "-v", "error",
+        "-ss", f"{start_ms / 1000:.3f}",
+        "-i", audio_path,
+    ]
+    if duration_ms is not None:
+        cmd += ["-t", f"{duration_ms / 1000:.3f}"]
+    cmd += ["-vn", *codec_args, "pipe:1"]
+    return cmd
+
+
+def read_segment(
+    audio_path: str,
+    start_ms: int,
+    duration_ms: int,
+    codec_args: list[str],
+) -> bytes:
+    """
+    Cut one segment out of an audio file with ffmpeg, in memory.
+
+    Seeking happens on the input side, so ffmpeg skips straight to the
+    segment instead of decoding everything before it. The encoded segment
+    is read from ffmpeg's stdout, so nothing is written to disk.
+
+    Args:
+        audio_path: Path to the source audio file
+        start_ms: Segment start in milliseconds
+        duration_ms: Segment duration in milliseconds
+        codec_args: ffmpeg output codec and format arguments,
+            e.g. ["-c:a", "libmp3lame", "-f", "mp3"]
+
+    Returns:
+        Encoded segment bytes
+    """
+    result = subprocess.run(
+        _segment_cmd(audio_path, start_ms, duration_ms, codec_args),
+        capture_output=True,
+        check=True,
+    )
+    return result.stdout
+
+
+def iter_segment(
+    audio_path: str,
+    start_ms: int,
+    duration_ms: int | None,
+    codec_args: list[str],
+    chunk_size: int = PIPE_CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """
+    Decode one segment of an audio file with ffmpeg, streaming the output.
+
+    Like read_segment, but ffmpeg's output is yielded in chunks as it is
+    produced, so the segment is never held in memory whole.
+
+    Args:
+        audio_path: Path to the source audio file
+        start_ms: Segment start in milliseconds
+        duration_ms: Segment duration in milliseconds, or None to read to
+            the end of the file
+        codec_args: ffmpeg output codec and format arguments,
+            e.g. ["-c:a", "pcm_s16le", "-f", "s16le"]
+        chunk_size: Maximum size of each yielded chunk in bytes
+
+    Yields:
+        Chunks of encoded segment bytes
+    """
+    # stderr is discarded so ffmpeg can never block on a full pipe while
+    # we are reading its stdout
+    proc = subprocess.Popen(
+        _segment_cmd(audio_path, start_ms, duration_ms, codec_args),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while chunk := proc.stdout.read(chunk_size):
+            yield chunk
+    except BaseException:
+        proc.kill()
+        raise
+    finally:
+        proc.stdout.close()
+        proc.wait()
+
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, proc.args)
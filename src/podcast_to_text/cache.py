@@ -0,0 +1,64 @@
+"""On-disk cache helpers."""
+
+import os
+import tempfile
+import time
+from pathlib import Path
+
+
+def cache_dir(*parts: str) -> Path:
+    """
+    Return the cache directory.
+
+    Uses $XDG_CACHE_HOME/podcast-to-text (default ~/.cache/podcast-to-text).
+    The directory is created by write_cache, so a missing or unwritable
+    cache location turns every lookup into a miss instead of an error.
+
+    Args:
+        parts: Optional subdirectory names below the cache root
+
+    Returns:
+        Path to the cache directory
+    """
+    base = os.getenv("XDG_CACHE_HOME")
+    if not base:
+        try:
+            base = Path.home() / ".cache"
+        except (RuntimeError, KeyError):
+            # No home directory to resolve; fall back to the temp dir
+            base = tempfile.gettempdir()
+    return Path(base, "podcast-to-text", *parts)
+
+
+def read_cache(path: Path, ttl_seconds: float | None = None) -> bytes | None:
+    """
+    Read a cache entry.
+
+    Args:
+        path: Cache file path
+        ttl_seconds: Maximum age of the entry, or None for no expiry
+
+    Returns:
+        Cached bytes, or None if missing or expired
+    """
+    try:
+        if ttl_seconds is not None and time.time() - path.stat().st_mtime > ttl_seconds:
+            return None
+        return path.read_bytes()
+    except OSError:
+        return None
+
+
+def write_cache(path: Path, data: bytes) -> None:
+    """
+    Atomically write a cache entry, creating its directory if needed.
+
+    Caching is best-effort: write errors are ignored.
+    """
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_bytes(data)
+        tmp.replace(path)
+    except OSError:
+        tmp.unlink(missing_ok=True)
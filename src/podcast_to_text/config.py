@@ -1,13 +1,29 @@
 """Configuration management."""
 
+import functools
 import os
+from dataclasses import dataclass
 from pathlib import Path
 
 from dotenv import load_dotenv
-from pydantic import BaseModel
 
 
-class Config(BaseModel):
+def _env_int(name: str, default: int | None) -> int | None:
+    """Read a positive integer environment variable, using default if unset or empty."""
+    value = os.getenv(name, "").strip()
+    if not value:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise ValueError(f"{name} must be a positive integer, got {value!r}")
+    return number
+
+
+@dataclass(slots=True, frozen=True)
+class Config:
     """Application configuration."""
 
     # Azure Speech
@@ -18,9 +34,11 @@ class Config(BaseModel):
     openai_endpoint: str | None = None
     openai_key: str | None = None
     openai_deployment: str | None = None
+    openai_concurrency: int = 4
 
     # ASR Provider
     asr_provider: str = "azure"  # "azure" or "qwen"
+    asr_concurrency: int | None = None  # None: the provider's default
 
     # Qwen ASR
     qwen_asr_url: str | None = None
@@ -32,11 +50,14 @@ class Config(BaseModel):
     # Options
     keep_audio: bool = False
 
-    model_config = {"arbitrary_types_allowed": True}
-
     @classmethod
+    @functools.lru_cache(maxsize=1)
     def from_env(cls) -> "Config":
-        """Load configuration from environment variables."""
+        """Load configuration from environment variables.
+
+        The .env file is read once per process and the result is cached.
+        Config is frozen, so derive variants with dataclasses.replace().
+        """
         load_dotenv()
         return cls(
             speech_key=os.getenv("AZURE_SPEECH_KEY"),
@@ -44,7 +65,9 @@ class Config(BaseModel):
             openai_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
             openai_key=os.getenv("AZURE_OPENAI_KEY"),
             openai_deployment=os.getenv("AZURE_OPENAI_DEPLOYMENT"),
+            openai_concurrency=_env_int("OPENAI_CONCURRENCY", 4),
             asr_provider=os.getenv("ASR_PROVIDER", "azure"),
+            asr_concurrency=_env_int("ASR_CONCURRENCY", None),
             qwen_asr_url=os.getenv("QWEN_ASR_URL"),
         )
 
@@ -1,16 +1,74 @@
 """Podcast downloader using yt-dlp and iTunes API fallback."""
 
+import functools
 import os
 import re
+import shutil
 import subprocess
+import sys
+import tempfile
 from pathlib import Path
+from urllib.parse import urlparse
 
+import orjson
 import requests
-import yt_dlp
+from requests.adapters import HTTPAdapter, Retry
 from rich.console import Console
 
+from .cache import cache_dir, read_cache, write_cache
+
 console = Console()
 
+# Shared session so repeat requests to the same host reuse TLS connections
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+    ),
+)
+_SESSION.mount("https://", _ADAPTER)
+_SESSION.mount("http://", _ADAPTER)
+
+# Read size for streamed audio downloads (1 MiB)
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Read size for streamed episode page HTML (64 KiB)
+HTML_CHUNK_SIZE = 64 * 1024
+
+# Speech recognizers expect 16 kHz mono; convert once at download time
+ASR_AUDIO_ARGS = ["-ac", "1", "-ar", "16000"]
+
+# Containers that ffmpeg may need to seek in, so they can't be piped
+_SEEKABLE_INPUT_SUFFIXES = {".m4a", ".mp4", ".m4b"}
+
+# Content types servers use for the same containers, for URLs (trackers,
+# redirects) whose path doesn't end in a telling suffix
+_SEEKABLE_CONTENT_TYPES = {"audio/mp4", "audio/x-m4a", "audio/m4a", "audio/aac", "video/mp4"}
+
+# How long a cached iTunes episode listing stays fresh (24 hours)
+ITUNES_CACHE_TTL = 24 * 60 * 60
+
+# Apple Podcast URL: https://podcasts.apple.com/.../id{podcast_id}?i={episode_id}
+_APPLE_ID_RE = re.compile(r"/id(\d+)")
+_APPLE_EP_RE = re.compile(r"[?&]i=(\d+)")
+
+# Characters not allowed in filenames
+_FN_SANITIZE_RE = re.compile(r'[<>:"/\\|?*]')
+
+# Episode page scraping
+_AUDIO_M4A_RE = re.compile(rb'(https://[^"<>\s]+\.m4a[^"<>\s]*)')
+_AUDIO_MP3_RE = re.compile(rb'(https://[^"<>\s]+\.mp3[^"<>\s]*)')
+_TITLE_RE = re.compile(rb'<title>([^<]+)</title>')
+_OG_TITLE_RE = re.compile(rb'property="og:title"\s+content="([^"]+)"')
+_APPLE_SUFFIX_RE = re.compile(r'\s*[-–].*Apple.*$', re.IGNORECASE)
+
+# Longest audio URL we expect to scrape; bounds how far back a match can start
+_MAX_URL_LENGTH = 2048
+
 
 def extract_apple_podcast_ids(url: str) -> tuple[str | None, str | None]:
     """
@@ -19,9 +77,8 @@ def extract_apple_podcast_ids(url: str) -> tuple[str | None, str | None]:
     Returns:
         Tuple of (podcast_id, episode_id) or (None, None) if not an Apple Podcast URL
     """
-    # Pattern: https://podcasts.apple.com/.../id{podcast_id}?i={episode_id}
-    podcast_match = re.search(r"/id(\d+)", url)
-    episode_match = re.search(r"[?&]i=(\d+)", url)
+    podcast_match = _APPLE_ID_RE.search(url)
+    episode_match = _APPLE_EP_RE.search(url)
 
     if podcast_match:
         podcast_id = podcast_match.group(1)
@@ -31,6 +88,50 @@ def extract_apple_podcast_ids(url: str) -> tuple[str | None, str | None]:
     return None, None
 
 
+@functools.lru_cache(maxsize=32)
+def _load_itunes_episodes(
+    podcast_id: str, refresh: bool = False
+) -> tuple[dict[str, dict], bool]:
+    """
+    Load a podcast's episode listing from the iTunes API, indexed by trackId.
+
+    The raw API response is cached on disk for ITUNES_CACHE_TTL seconds and
+    the parsed index is memoized per process.
+
+    Args:
+        podcast_id: Apple Podcast ID
+        refresh: Ignore the on-disk cache and fetch a fresh listing
+
+    Returns:
+        Tuple of (episodes by trackId, whether the listing came from disk)
+    """
+    cache_path = cache_dir() / f"itunes_{podcast_id}.json"
+    data = None
+    raw = None if refresh else read_cache(cache_path, ITUNES_CACHE_TTL)
+    if raw is not None:
+        try:
+            data = orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            # Corrupt cache entry; treat it as a miss and refetch
+            pass
+    from_disk = data is not None
+
+    if data is None:
+        api_url = f"https://itunes.apple.com/lookup?id={podcast_id}&entity=podcastEpisode&limit=200"
+        response = _SESSION.get(api_url, timeout=30)
+        response.raise_for_status()
+        raw = response.content
+        data = orjson.loads(raw)
+        write_cache(cache_path, raw)
+
+    episodes = {
+        str(result.get("trackId")): result
+        for result in data.get("results", [])
+        if result.get("wrapperType") == "podcastEpisode"
+    }
+    return episodes, from_disk
+
+
 def get_episode_from_itunes_api(podcast_id: str, episode_id: str) -> dict | None:
     """
     Fetch episode info from iTunes API.
@@ -38,17 +139,12 @@ def get_episode_from_itunes_api(podcast_id: str, episode_id: str) -> dict | None
     Returns:
         Episode dict with 'episodeUrl' and 'trackName', or None if not found
     """
-    api_url = f"https://itunes.apple.com/lookup?id={podcast_id}&entity=podcastEpisode&limit=200"
-
     try:
-        response = requests.get(api_url, timeout=30)
-        response.raise_for_status()
-        data = response.json()
-
-        for result in data.get("results", []):
-            if result.get("wrapperType") == "podcastEpisode":
-                if str(result.get("trackId")) == episode_id:
-                    return result
+        episodes, from_disk = _load_itunes_episodes(podcast_id)
+        if episode_id not in episodes and from_disk:
+            # The episode may be newer than the cached listing
+            episodes, _ = _load_itunes_episodes(podcast_id, refresh=True)
+        return episodes.get(episode_id)
 
     except Exception as e:
         console.print(f"[yellow]iTunes API error: {e}[/yellow]")
@@ -56,12 +152,41 @@ def get_episode_from_itunes_api(podcast_id: str, episode_id: str) -> dict | None
     return None
 
 
+def _search_audio_url(
+    html: bytes,
+    extension: bytes,
+    pattern: re.Pattern,
+    start: int = 0,
+    complete: bool = False,
+) -> str | None:
+    """
+    Find the first complete audio URL with the given extension in html[start:].
+
+    A plain substring check rules the regex out entirely when the extension
+    never appears. Otherwise the search starts shortly before the first
+    occurrence instead of at start. A match running into the end of the
+    buffer may be cut off mid-URL, so it is ignored until more data arrives,
+    unless complete says the whole page has been read.
+    """
+    pos = html.find(extension, start)
+    if pos == -1:
+        return None
+    match = pattern.search(html, max(start, pos - _MAX_URL_LENGTH))
+    if not match or (match.end() == len(html) and not complete):
+        return None
+    return match.group(1).decode("utf-8", errors="replace")
+
+
 def get_episode_from_webpage(url: str) -> dict | None:
     """
     Scrape episode info directly from Apple Podcast webpage.
 
     This is a fallback when iTunes API doesn't have the episode (e.g., older episodes).
 
+    The page is streamed and scanned as raw bytes with byte patterns (ASCII
+    character classes, no Unicode decode); only matched groups are decoded.
+    Reading stops once an .m4a URL and the end of <head> have both been seen.
+
     Returns:
         Dict with 'episodeUrl' and 'trackName', or None if not found
     """
@@ -71,48 +196,78 @@ def get_episode_from_webpage(url: str) -> dict | None:
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
             "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
         }
-        # Follow redirects (Apple redirects based on region)
-        response = requests.get(url, headers=headers, timeout=30, allow_redirects=True)
-        response.raise_for_status()
-        # Force UTF-8 encoding
-        response.encoding = 'utf-8'
-        html = response.text
 
-        # Look for audio URL patterns (m4a or mp3)
-        audio_match = re.search(r'(https://[^"<>\s]+\.m4a[^"<>\s]*)', html)
-        if not audio_match:
-            audio_match = re.search(r'(https://[^"<>\s]+\.mp3[^"<>\s]*)', html)
+        buf = bytearray()
+        head_end = -1
+        m4a_url = mp3_url = None
 
-        if not audio_match:
+        # Follow redirects (Apple redirects based on region)
+        with _SESSION.get(
+            url, headers=headers, timeout=30, allow_redirects=True, stream=True
+        ) as response:
+            response.raise_for_status()
+
+            for piece in response.iter_content(chunk_size=HTML_CHUNK_SIZE):
+                # Step back a URL's length so URLs split across reads still match
+                scan_from = max(0, len(buf) - _MAX_URL_LENGTH)
+                buf += piece
+
+                if head_end == -1:
+                    head_end = buf.find(b"</head>", scan_from)
+
+                # Look for audio URL patterns (m4a preferred over mp3)
+                if m4a_url is None:
+                    m4a_url = _search_audio_url(buf, b".m4a", _AUDIO_M4A_RE, scan_from)
+                if m4a_url is None and mp3_url is None:
+                    mp3_url = _search_audio_url(buf, b".mp3", _AUDIO_MP3_RE, scan_from)
+
+                if m4a_url and head_end != -1:
+                    break
+            else:
+                # The page is complete; a URL ending right at EOF is whole
+                scan_from = max(0, len(buf) - _MAX_URL_LENGTH)
+                if m4a_url is None:
+                    m4a_url = _search_audio_url(
+                        buf, b".m4a", _AUDIO_M4A_RE, scan_from, complete=True
+                    )
+                if m4a_url is None and mp3_url is None:
+                    mp3_url = _search_audio_url(
+                        buf, b".mp3", _AUDIO_MP3_RE, scan_from, complete=True
+                    )
+
+        audio_url = m4a_url or mp3_url
+        if not audio_url:
             return None
 
-        audio_url = audio_match.group(1)
+        # <title> and og:title live in <head>; don't scan the page body for them
+        if head_end == -1:
+            head_end = len(buf)
 
         # Try to extract episode title
         # Pattern 1: Look for title in <title> tag (format: "Episode Title - Podcast Name - Apple 播客")
         title = "podcast_episode"
-        title_match = re.search(r'<title>([^<]+)</title>', html)
+        title_match = _TITLE_RE.search(buf, 0, head_end)
         if title_match:
-            raw_title = title_match.group(1)
+            raw_title = title_match.group(1).decode("utf-8", errors="replace")
             # Check if it's an episode page (not web player)
             if "网页播放器" not in raw_title and "Web Player" not in raw_title:
                 # Clean up title (remove " - ... - Apple 播客" suffix)
-                title = re.sub(r'\s*[-–].*Apple.*$', '', raw_title, flags=re.IGNORECASE)
+                title = _APPLE_SUFFIX_RE.sub('', raw_title)
                 title = title.strip()
 
         # Pattern 2: If title is still generic, try og:title
         if title == "podcast_episode" or "播放器" in title or "Player" in title:
-            og_match = re.search(r'property="og:title"\s+content="([^"]+)"', html)
+            og_match = _OG_TITLE_RE.search(buf, 0, head_end)
             if og_match:
-                og_title = og_match.group(1)
-                og_title = re.sub(r'\s*[-–].*Apple.*$', '', og_title, flags=re.IGNORECASE)
+                og_title = og_match.group(1).decode("utf-8", errors="replace")
+                og_title = _APPLE_SUFFIX_RE.sub('', og_title)
                 og_title = og_title.strip()
                 if og_title and "播放器" not in og_title and "Player" not in og_title:
                     title = og_title
 
         # Pattern 3: Extract from URL as fallback
         if title == "podcast_episode" or not title or "播放器" in title or "Player" in title:
-            episode_id_match = re.search(r'[?&]i=(\d+)', url)
+            episode_id_match = _APPLE_EP_RE.search(url)
             if episode_id_match:
                 title = f"episode_{episode_id_match.group(1)}"
 
@@ -123,46 +278,128 @@ def get_episode_from_webpage(url: str) -> dict | None:
         return None
 
 
+class _ProgressWriter:
+    """File wrapper that reports download progress as bytes are written."""
+
+    def __init__(self, f, total_size: int):
+        self.f = f
+        self.total_size = total_size
+        self.downloaded = 0
+        # Byte count at which the next whole percent is reached
+        self.next_report = 0
+
+    def write(self, data: bytes) -> int:
+        written = self.f.write(data)
+        self.downloaded += len(data)
+        if self.total_size and self.downloaded >= self.next_report:
+            percent = self.downloaded * 100 // self.total_size
+            self.next_report = (percent + 1) * self.total_size // 100
+            # Plain write: Rich would re-parse markup on every update
+            sys.stdout.write(f"  Downloading: {percent}%\r")
+            sys.stdout.flush()
+        return written
+
+
+def _ffmpeg_wav_cmd(input_path: str, wav_path: Path) -> list[str]:
+    """Build the ffmpeg command that converts input_path to ASR-ready WAV."""
+    return [
+        "ffmpeg",
+        "-threads", "0",
+        "-i", input_path,
+        "-vn",
+        *ASR_AUDIO_ARGS,
+        "-c:a", "pcm_s16le",
+        "-y", str(wav_path),
+    ]
+
+
 def download_direct_audio(audio_url: str, title: str, output_dir: Path) -> tuple[str, str]:
     """
     Download audio directly from URL and convert to WAV.
 
+    The download is piped straight into ffmpeg so transcoding overlaps with
+    the transfer. MP4 containers (m4a), recognized by URL suffix or
+    Content-Type, are staged on disk first, because their index may sit at
+    the end of the file where a pipe can't seek.
+
     Returns:
         Tuple of (path to WAV file, episode title)
     """
     # Sanitize filename
-    safe_title = re.sub(r'[<>:"/\\|?*]', "_", title)[:100]
-    temp_path = output_dir / f"{safe_title}.m4a"
+    safe_title = _FN_SANITIZE_RE.sub("_", title)[:100]
     wav_path = output_dir / f"{safe_title}.wav"
 
     console.print(f"[bold blue]Downloading: {title[:50]}...[/bold blue]")
 
-    # Download with requests
-    response = requests.get(audio_url, stream=True, timeout=600)
+    response = _SESSION.get(audio_url, stream=True, timeout=600)
     response.raise_for_status()
 
     total_size = int(response.headers.get("content-length", 0))
-    downloaded = 0
 
-    with open(temp_path, "wb") as f:
-        for chunk in response.iter_content(chunk_size=8192):
-            f.write(chunk)
-            downloaded += len(chunk)
-            if total_size:
-                percent = (downloaded / total_size) * 100
-                console.print(f"  Downloading: {percent:.1f}%", end="\r")
+    # Let urllib3 undo any gzip/deflate transfer encoding while copying
+    response.raw.decode_content = True
+
+    suffix = Path(urlparse(audio_url).path).suffix.lower()
+    content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+    if suffix in _SEEKABLE_INPUT_SUFFIXES or content_type in _SEEKABLE_CONTENT_TYPES:
+        if suffix not in _SEEKABLE_INPUT_SUFFIXES:
+            suffix = ".m4a"
+        temp_path = output_dir / f"{safe_title}{suffix}"
+        with open(temp_path, "wb") as f:
+            shutil.copyfileobj(
+                response.raw,
+                _ProgressWriter(f, total_size),
+                length=DOWNLOAD_CHUNK_SIZE,
+            )
 
-    console.print("\n  Download complete, converting to WAV...")
-
-    # Convert to WAV using ffmpeg
-    subprocess.run(
-        ["ffmpeg", "-i", str(temp_path), "-y", str(wav_path)],
-        capture_output=True,
-        check=True,
-    )
+        console.print("\n  Download complete, converting to WAV...")
 
-    # Clean up temp file
-    temp_path.unlink()
+        # Convert to WAV using ffmpeg
+        subprocess.run(
+            _ffmpeg_wav_cmd(str(temp_path), wav_path),
+            capture_output=True,
+            check=True,
+        )
+
+        # Clean up temp file
+        temp_path.unlink()
+    else:
+        # stderr goes to a temp file rather than a pipe so ffmpeg can never
+        # block on it while we are still writing to its stdin
+        with tempfile.TemporaryFile() as stderr_file:
+            proc = subprocess.Popen(
+                _ffmpeg_wav_cmd("pipe:0", wav_path),
+                stdin=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
+                stderr=stderr_file,
+            )
+            try:
+                shutil.copyfileobj(
+                    response.raw,
+                    _ProgressWriter(proc.stdin, total_size),
+                    length=DOWNLOAD_CHUNK_SIZE,
+                )
+            except BrokenPipeError:
+                # ffmpeg exited early; its return code below reports the failure
+                pass
+            except BaseException:
+                proc.kill()
+                proc.wait()
+                raise
+            finally:
+                try:
+                    proc.stdin.close()
+                except BrokenPipeError:
+                    pass
+
+            console.print("\n  Download complete, finishing WAV conversion...")
+
+            if proc.wait() != 0:
+                stderr_file.seek(0)
+                detail = stderr_file.read().decode("utf-8", errors="replace").strip()
+                raise ValueError(
+                    f"ffmpeg failed to convert the download: {detail[-500:] or proc.returncode}"
+                )
 
     return str(wav_path), title
 
@@ -174,6 +411,8 @@ def download_with_ytdlp(url: str, output_dir: Path) -> tuple[str, str]:
     Returns:
         Tuple of (path to WAV file, episode title)
     """
+    import yt_dlp
+
     ydl_opts = {
         "format": "bestaudio/best",
         "outtmpl": str(output_dir / "%(title)s.%(ext)s"),
@@ -184,6 +423,7 @@ def download_with_ytdlp(url: str, output_dir: Path) -> tuple[str, str]:
                 "preferredquality": "192",
             }
         ],
+        "postprocessor_args": {"extractaudio": ASR_AUDIO_ARGS},
         "progress_hooks": [_progress_hook],
         "quiet": True,
         "no_warnings": True,
@@ -192,14 +432,21 @@ def download_with_ytdlp(url: str, output_dir: Path) -> tuple[str, str]:
     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
         info = ydl.extract_info(url, download=True)
         title = info.get("title", "podcast")
-        safe_title = yt_dlp.utils.sanitize_filename(title)
-        audio_path = output_dir / f"{safe_title}.wav"
+
+        # yt-dlp records the post-processed file path on the info dict
+        downloads = info.get("requested_downloads") or [{}]
+        filepath = downloads[0].get("filepath")
+        if filepath:
+            audio_path = Path(filepath)
+        else:
+            safe_title = yt_dlp.utils.sanitize_filename(title)
+            audio_path = output_dir / f"{safe_title}.wav"
 
         if not audio_path.exists():
-            wav_files = list(output_dir.glob("*.wav"))
-            if wav_files:
-                audio_path = wav_files[0]
-            else:
+            audio_path = next(
+                (p for p in output_dir.iterdir() if p.suffix == ".wav"), None
+            )
+            if audio_path is None:
                 raise FileNotFoundError(f"Downloaded audio not found in {output_dir}")
 
     return str(audio_path), title
@@ -1,14 +1,43 @@
 """Text formatting using Azure OpenAI."""
 
-from openai import AzureOpenAI
+import functools
+import hashlib
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import TYPE_CHECKING
+
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn
 
+from .cache import cache_dir, read_cache, write_cache
+
+if TYPE_CHECKING:
+    import tiktoken
+    from openai import AzureOpenAI
+
 console = Console()
 
 # Target chunk size in characters
 CHUNK_SIZE = 8000
 
+# Target chunk size in tokens. The model has to echo the whole chunk back,
+# so this is bounded by the completion limit rather than the context window.
+CHUNK_TOKENS = 6000
+
+# Tokenizer used by GPT-4o deployments
+TOKEN_ENCODING = "o200k_base"
+
+# Sentence-ending punctuation used to pick chunk boundaries
+_SENTENCE_END_RE = re.compile(r"[。！？.!?]")
+
+# Default number of concurrent chat completion requests
+DEFAULT_CONCURRENCY = 4
+
+# How long formatted chunks stay cached (30 days)
+FORMAT_CACHE_TTL = 30 * 24 * 60 * 60
+
 SYSTEM_PROMPT = """你是一个专业的文字编辑。你的任务是将语音识别的播客转写文本格式化为清晰易读的 Markdown 格式。
 
 【最重要的原则】必须保留原文的每一句话，不得删减、省略或总结任何内容。输出文本的信息量必须与输入完全一致。
@@ -28,6 +57,10 @@ SYSTEM_PROMPT = """你是一个专业的文字编辑。你的任务是将语音
 
 输出纯 Markdown 格式，不需要代码块包裹。"""
 
+USER_PROMPT = "请格式化以下播客转写文本：\n\n{text}"
+
+TEMPERATURE = 0.3
+
 
 def split_text_into_chunks(text: str, chunk_size: int = CHUNK_SIZE) -> list[str]:
     """
@@ -55,15 +88,15 @@ def split_text_into_chunks(text: str, chunk_size: int = CHUNK_SIZE) -> list[str]
             chunks.append(text[start:])
             break
 
-        # Try to find a sentence boundary near the end
-        search_start = max(start, end - 200)
+        # Split after the last sentence boundary near the end, if any
+        search_start = max(start + 1, end - 200)
         best_split = end
 
-        for punct in ["。", "！", "？", ".", "!", "?"]:
-            pos = text.rfind(punct, search_start, end)
-            if pos > start:
-                best_split = pos + 1
-                break
+        last_match = None
+        for last_match in _SENTENCE_END_RE.finditer(text, search_start, end):
+            pass
+        if last_match:
+            best_split = last_match.end()
 
         chunks.append(text[start:best_split])
         start = best_split
@@ -71,41 +104,73 @@ def split_text_into_chunks(text: str, chunk_size: int = CHUNK_SIZE) -> list[str]
     return chunks
 
 
-def split_into_chunks(segments: list[dict], chunk_size: int = CHUNK_SIZE) -> list[str]:
+@functools.lru_cache(maxsize=1)
+def _get_encoding() -> "tiktoken.Encoding":
+    """Load the tokenizer once, on first use."""
+    import tiktoken
+
+    return tiktoken.get_encoding(TOKEN_ENCODING)
+
+
+def split_into_chunks(segments: list[dict], chunk_tokens: int = CHUNK_TOKENS) -> list[str]:
     """
     Split transcription segments into chunks for LLM processing.
 
+    Each segment is tokenized once and chunks are packed by summed token
+    counts, so every request is sized to what the model actually sees.
+
     Args:
         segments: List of transcription segments with timestamps
-        chunk_size: Target size of each chunk in characters
+        chunk_tokens: Target size of each chunk in tokens
 
     Returns:
         List of text chunks
     """
+    texts = [seg["text"] for seg in segments]
+    token_counts = map(len, _get_encoding().encode_ordinary_batch(texts))
     chunks = []
-    current_chunk = []
+    chunk_start = 0
     current_size = 0
 
-    for seg in segments:
-        text = seg["text"]
-        if current_size + len(text) > chunk_size and current_chunk:
-            chunks.append("".join(current_chunk))
-            current_chunk = []
+    # Track chunk boundaries as indices into texts and join each slice once
+    for i, size in enumerate(token_counts):
+        if current_size + size > chunk_tokens and i > chunk_start:
+            chunks.append("".join(texts[chunk_start:i]))
+            chunk_start = i
             current_size = 0
 
-        current_chunk.append(text)
-        current_size += len(text)
+        current_size += size
 
-    if current_chunk:
-        chunks.append("".join(current_chunk))
+    if chunk_start < len(texts):
+        chunks.append("".join(texts[chunk_start:]))
 
     return chunks
 
 
-def format_chunk(text: str, client: AzureOpenAI, deployment: str) -> str:
+def _format_cache_path(text: str, deployment: str) -> Path:
+    """Cache file for a chunk, keyed by everything that shapes the response."""
+    key = json.dumps(
+        {
+            "deployment": deployment,
+            "system": SYSTEM_PROMPT,
+            "user": USER_PROMPT,
+            "temperature": TEMPERATURE,
+            "text": text,
+        },
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+    return cache_dir("format") / f"{digest}.md"
+
+
+def format_chunk(text: str, client: "AzureOpenAI", deployment: str) -> str:
     """
     Format a single text chunk using Azure OpenAI.
 
+    Responses are cached on disk for FORMAT_CACHE_TTL seconds, so re-running
+    on the same transcript (or resuming a failed run) skips finished chunks.
+
     Args:
         text: Text to format
         client: Azure OpenAI client
@@ -114,16 +179,72 @@ def format_chunk(text: str, client: AzureOpenAI, deployment: str) -> str:
     Returns:
         Formatted Markdown text
     """
+    cache_path = _format_cache_path(text, deployment)
+    cached = read_cache(cache_path, FORMAT_CACHE_TTL)
+    if cached is not None:
+        return cached.decode("utf-8")
+
     response = client.chat.completions.create(
         model=deployment,
         messages=[
             {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": f"请格式化以下播客转写文本：\n\n{text}"},
+            {"role": "user", "content": USER_PROMPT.format(text=text)},
         ],
-        temperature=0.3,
+        temperature=TEMPERATURE,
     )
 
-    return response.choices[0].message.content
+    formatted = response.choices[0].message.content
+    if formatted:
+        write_cache(cache_path, formatted.encode("utf-8"))
+    return formatted
+
+
+def format_chunks(
+    chunks: list[str],
+    client: "AzureOpenAI",
+    deployment: str,
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> list[str]:
+    """
+    Format text chunks concurrently, preserving their original order.
+
+    Args:
+        chunks: Text chunks to format
+        client: Azure OpenAI client (shared across worker threads)
+        deployment: Model deployment name
+        concurrency: Maximum number of requests in flight
+
+    Returns:
+        Formatted chunks in the same order as the input
+    """
+    formatted_chunks: list[str] = [""] * len(chunks)
+
+    with Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        BarColumn(),
+        TaskProgressColumn(),
+        console=console,
+    ) as progress:
+        task = progress.add_task("Formatting text", total=len(chunks))
+
+        max_workers = max(1, min(concurrency, len(chunks)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(format_chunk, chunk, client, deployment): i
+                for i, chunk in enumerate(chunks)
+            }
+            try:
+                for future in as_completed(futures):
+                    formatted_chunks[futures[future]] = future.result()
+                    progress.update(task, advance=1)
+            except BaseException:
+                # Don't send the queued chunks once one fails or on Ctrl-C
+                for future in futures:
+                    future.cancel()
+                raise
+
+    return formatted_chunks
 
 
 def format_transcript(
@@ -131,6 +252,7 @@ def format_transcript(
     endpoint: str,
     api_key: str,
     deployment: str,
+    concurrency: int = DEFAULT_CONCURRENCY,
 ) -> str:
     """
     Format transcription using Azure OpenAI, handling long text by chunking.
@@ -140,6 +262,7 @@ def format_transcript(
         endpoint: Azure OpenAI endpoint
         api_key: Azure OpenAI API key
         deployment: Model deployment name
+        concurrency: Maximum number of chunks formatted in parallel
 
     Returns:
         Formatted Markdown text
@@ -154,6 +277,8 @@ def format_transcript(
     chunks = split_into_chunks(segments)
     console.print(f"[bold]Split into {len(chunks)} chunks for formatting[/bold]")
 
+    from openai import AzureOpenAI
+
     # Initialize Azure OpenAI client
     client = AzureOpenAI(
         azure_endpoint=endpoint,
@@ -161,21 +286,7 @@ def format_transcript(
         api_version="2024-02-15-preview",
     )
 
-    formatted_chunks = []
-
-    with Progress(
-        SpinnerColumn(),
-        TextColumn("[progress.description]{task.description}"),
-        BarColumn(),
-        TaskProgressColumn(),
-        console=console,
-    ) as progress:
-        task = progress.add_task("Formatting text", total=len(chunks))
-
-        for chunk in chunks:
-            formatted = format_chunk(chunk, client, deployment)
-            formatted_chunks.append(formatted)
-            progress.update(task, advance=1)
+    formatted_chunks = format_chunks(chunks, client, deployment, concurrency)
 
     # Combine all formatted chunks
     result = "\n\n".join(formatted_chunks)
@@ -189,6 +300,7 @@ def format_text(
     endpoint: str,
     api_key: str,
     deployment: str,
+    concurrency: int = DEFAULT_CONCURRENCY,
 ) -> str:
     """
     Format plain text using Azure OpenAI, handling long text by chunking.
@@ -198,6 +310,7 @@ def format_text(
         endpoint: Azure OpenAI endpoint
         api_key: Azure OpenAI API key
         deployment: Model deployment name
+        concurrency: Maximum number of chunks formatted in parallel
 
     Returns:
         Formatted Markdown text
@@ -208,6 +321,8 @@ def format_text(
     chunks = split_text_into_chunks(text)
     console.print(f"[bold]Split into {len(chunks)} chunks for formatting[/bold]")
 
+    from openai import AzureOpenAI
+
     # Initialize Azure OpenAI client
     client = AzureOpenAI(
         azure_endpoint=endpoint,
@@ -215,21 +330,7 @@ def format_text(
         api_version="2024-02-15-preview",
     )
 
-    formatted_chunks = []
-
-    with Progress(
-        SpinnerColumn(),
-        TextColumn("[progress.description]{task.description}"),
-        BarColumn(),
-        TaskProgressColumn(),
-        console=console,
-    ) as progress:
-        task = progress.add_task("Formatting text", total=len(chunks))
-
-        for chunk in chunks:
-            formatted = format_chunk(chunk, client, deployment)
-            formatted_chunks.append(formatted)
-            progress.update(task, advance=1)
+    formatted_chunks = format_chunks(chunks, client, deployment, concurrency)
 
     # Combine all formatted chunks
     result = "\n\n".join(formatted_chunks)
@@ -1,6 +1,7 @@
 """CLI entry point for podcast-to-text."""
 
 import sys
+from dataclasses import replace
 from pathlib import Path
 
 import click
@@ -124,26 +125,24 @@ def main(
         console.print("Run with --help for usage information.")
         sys.exit(1)
 
-    # Build config
-    config = Config.from_env()
-    config = config.model_copy(
-        update={
-            "output_dir": Path(output),
-            "audio_dir": Path(audio_dir),
-            "keep_audio": keep_audio,
-        }
-    )
-
-    # Build context
-    ctx = PipelineContext(
-        config=config,
-        source_url=source,
-        audio_path=Path(audio) if audio else None,
-        text_path=Path(text) if text else None,
-    )
-
-    # Run pipeline
     try:
+        # Build config
+        config = replace(
+            Config.from_env(),
+            output_dir=Path(output),
+            audio_dir=Path(audio_dir),
+            keep_audio=keep_audio,
+        )
+
+        # Build context
+        ctx = PipelineContext(
+            config=config,
+            source_url=source,
+            audio_path=Path(audio) if audio else None,
+            text_path=Path(text) if text else None,
+        )
+
+        # Run pipeline
         pipeline = create_pipeline(mode, no_format)
         pipeline.run(ctx)
         console.print("\n[bold green]Done![/bold green]")
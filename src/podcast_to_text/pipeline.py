@@ -1,16 +1,21 @@
 """Pipeline execution framework."""
 
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Protocol
 
-from pydantic import BaseModel
 from rich.console import Console
 
 from .config import Config
 
 
-class PipelineContext(BaseModel):
-    """Context passed between pipeline steps."""
+@dataclass(slots=True)
+class PipelineContext:
+    """Context passed between pipeline steps.
+
+    Steps update it in place, so it is a plain dataclass rather than a
+    validated model.
+    """
 
     config: Config
 
@@ -23,16 +28,14 @@ class PipelineContext(BaseModel):
     text: str | None = None
     output_path: Path | None = None
 
-    model_config = {"arbitrary_types_allowed": True}
-
 
 class Step(Protocol):
     """Pipeline step interface."""
 
     name: str
 
-    def run(self, ctx: PipelineContext) -> PipelineContext:
-        """Execute step and return updated context."""
+    def run(self, ctx: PipelineContext) -> None:
+        """Execute step, updating the context in place."""
         ...
 
 
@@ -43,16 +46,14 @@ class Pipeline:
         self.steps = steps
         self.console = console or Console()
 
-    def run(self, ctx: PipelineContext) -> PipelineContext:
-        """Run all steps in sequence."""
+    def run(self, ctx: PipelineContext) -> None:
+        """Run all steps in sequence, updating the context in place."""
         total = len(self.steps)
 
-        for i, step in enumerate(self.steps, 1):
-            self.console.print(f"\n[bold]Step {i}/{total}: {step.name}[/bold]")
-            try:
-                ctx = step.run(ctx)
-            except Exception as e:
-                self.console.print(f"[bold red]Error in {step.name}:[/bold red] {e}")
-                raise
-
-        return ctx
+        try:
+            for i, step in enumerate(self.steps, 1):
+                self.console.print(f"\n[bold]Step {i}/{total}: {step.name}[/bold]")
+                step.run(ctx)
+        except Exception as e:
+            self.console.print(f"[bold red]Error in {step.name}:[/bold red] {e}")
+            raise
@@ -1,18 +1,25 @@
 """Qwen3-ASR transcription using OpenAI-compatible API."""
 
-import json
+import hashlib
 import os
-import re
-import tempfile
+import threading
+import time
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
+from typing import BinaryIO
 
 import httpx
-from pydub import AudioSegment
+import orjson
 from rich.console import Console
 from rich.live import Live
-from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn
+from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn, TaskID
 from rich.text import Text
 
+from .audio import probe_codec, probe_duration_ms, read_segment
+from .cache import cache_dir, read_cache, write_cache
+
 console = Console()
 
 # Model name for Qwen3-ASR
@@ -24,6 +31,28 @@ MAX_FILE_SIZE_MB = 25
 # Segment duration for long audio (10 minutes)
 SEGMENT_DURATION_MS = 10 * 60 * 1000
 
+# ffmpeg encoding for uploaded segments
+SEGMENT_CODEC_ARGS = ["-c:a", "libmp3lame", "-b:a", "64k", "-f", "mp3"]
+
+# Stream-copy MP3 sources at or below this bitrate instead of re-encoding
+COPY_MAX_BITRATE = 96_000
+SEGMENT_COPY_ARGS = ["-c:a", "copy", "-f", "mp3"]
+
+# Per-request timeout in seconds
+REQUEST_TIMEOUT = 600
+
+# Default number of segments transcribed in parallel
+DEFAULT_CONCURRENCY = 4
+
+# Marker that precedes the transcription in Qwen3-ASR output
+_ASR_TAG = "<asr_text>"
+
+# Characters of live transcription shown while streaming
+_PREVIEW_CHARS = 100
+
+# Live preview updates per second while streaming
+_PREVIEW_RATE = 5
+
 
 def _clean_text(text: str) -> str:
     """Clean Qwen ASR output text.
@@ -31,11 +60,19 @@ def _clean_text(text: str) -> str:
     Qwen3-ASR returns text in format: "language Chinese<asr_text>actual text"
     This function extracts the actual transcription.
     """
-    # Extract text after <asr_text> tag if present
-    match = re.search(r"<asr_text>(.*)$", text, re.DOTALL)
-    if match:
-        return match.group(1).strip()
-    return text.strip()
+    # Extract text after the first <asr_text> tag if present
+    _, tag, tail = text.partition(_ASR_TAG)
+    return (tail if tag else text).strip()
+
+
+def _preview_line(text: str) -> str:
+    """Format the start of a transcript for the live display ("" if empty)."""
+    text = text.lstrip()
+    if not text:
+        return ""
+    if len(text) > _PREVIEW_CHARS:
+        text = f"{text[:_PREVIEW_CHARS]}..."
+    return f"  {text}"
 
 
 def _parse_response(result: dict) -> list[dict]:
@@ -56,45 +93,78 @@ def _parse_response(result: dict) -> list[dict]:
     return [{"start": 0, "end": 0, "text": text}]
 
 
-def _get_file_size_mb(file_path: str) -> float:
-    """Get file size in MB."""
-    return os.path.getsize(file_path) / (1024 * 1024)
+def _status_error(e: httpx.HTTPStatusError) -> ValueError:
+    """Convert an HTTP error response from the ASR server into a ValueError."""
+    if e.response.status_code == 429:
+        return ValueError(
+            "Qwen ASR rate limited the request (429); lower ASR_CONCURRENCY"
+        )
+    return ValueError(f"Qwen ASR error: {e.response.status_code}")
 
 
-def _split_audio(audio_path: str, segment_duration_ms: int = SEGMENT_DURATION_MS) -> list[str]:
-    """Split long audio into segments."""
-    console.print("[bold blue]Splitting audio into segments...[/bold blue]")
+@dataclass(slots=True, frozen=True)
+class AudioFile:
+    """Audio file being transcribed, with its metadata read once up front."""
 
-    audio = AudioSegment.from_file(audio_path)
-    total_duration = len(audio)
-    segments = []
+    path: str
+    name: str
+    size_mb: float
 
-    temp_dir = tempfile.mkdtemp(prefix="qwen_asr_segments_")
+    @classmethod
+    def from_path(cls, path: str) -> "AudioFile":
+        """Stat the file once and capture what the transcription paths need."""
+        return cls(
+            path=path,
+            name=Path(path).name,
+            size_mb=os.path.getsize(path) / (1024 * 1024),
+        )
 
-    num_segments = (total_duration + segment_duration_ms - 1) // segment_duration_ms
 
-    with Progress(
-        SpinnerColumn(),
-        TextColumn("[progress.description]{task.description}"),
-        BarColumn(),
-        TaskProgressColumn(),
-        console=console,
-    ) as progress:
-        task = progress.add_task("Splitting audio", total=num_segments)
+def _asr_cache_path(digest: str, language: str) -> Path:
+    """Cache file for the transcription of audio with the given sha256."""
+    return cache_dir("asr") / f"{digest}.{language}.json"
 
-        for i, start in enumerate(range(0, total_duration, segment_duration_ms)):
-            end = min(start + segment_duration_ms, total_duration)
-            segment = audio[start:end]
 
-            # Export as mp3 for smaller file size
-            segment_path = os.path.join(temp_dir, f"segment_{i:04d}.mp3")
-            segment.export(segment_path, format="mp3", bitrate="64k")
-            segments.append(segment_path)
+def _read_asr_cache(cache_path: Path) -> list[dict] | None:
+    """Load cached transcription segments, or None on a miss."""
+    raw = read_cache(cache_path)
+    if raw is None:
+        return None
+    try:
+        return orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        return None
 
-            progress.update(task, advance=1)
 
-    console.print(f"[bold green]Split into {len(segments)} segments[/bold green]")
-    return segments
+def _split_audio(
+    audio_path: str,
+    progress: Progress,
+    task: TaskID,
+    segment_duration_ms: int = SEGMENT_DURATION_MS,
+) -> Iterator[tuple[str, bytes]]:
+    """Split long audio into segments, yielding (name, mp3 bytes) as each is encoded.
+
+    Progress is reported on the given task of the caller's Progress display.
+    """
+    total_duration = probe_duration_ms(audio_path)
+    num_segments = (total_duration + segment_duration_ms - 1) // segment_duration_ms
+
+    progress.update(task, total=num_segments)
+
+    # Low-bitrate MP3 is already small enough to upload, so cut it without
+    # decoding; anything else is encoded as mp3 for smaller upload size
+    codec, bit_rate = probe_codec(audio_path)
+    if codec == "mp3" and bit_rate is not None and bit_rate <= COPY_MAX_BITRATE:
+        codec_args = SEGMENT_COPY_ARGS
+    else:
+        codec_args = SEGMENT_CODEC_ARGS
+
+    for i, start in enumerate(range(0, total_duration, segment_duration_ms)):
+        duration = min(segment_duration_ms, total_duration - start)
+
+        content = read_segment(audio_path, start, duration, codec_args)
+        progress.update(task, advance=1)
+        yield f"segment_{i:04d}.mp3", content
 
 
 def transcribe_audio_qwen(
@@ -102,6 +172,7 @@ def transcribe_audio_qwen(
     api_url: str,
     language: str = "zh",
     stream: bool = False,
+    concurrency: int = DEFAULT_CONCURRENCY,
 ) -> list[dict]:
     """
     Transcribe audio using Qwen3-ASR API.
@@ -111,6 +182,7 @@ def transcribe_audio_qwen(
         api_url: Qwen ASR service URL
         language: Language code
         stream: Use streaming mode for real-time output
+        concurrency: Maximum number of segments transcribed in parallel
 
     Returns:
         List of transcription segments [{"start": 0.0, "end": 5.2, "text": "..."}]
@@ -120,25 +192,71 @@ def transcribe_audio_qwen(
     console.print("[bold blue]Transcribing with Qwen3-ASR...[/bold blue]")
 
     # Check file size
-    file_size_mb = _get_file_size_mb(audio_path)
-    console.print(f"[dim]Audio file size: {file_size_mb:.1f} MB[/dim]")
-
-    if file_size_mb > MAX_FILE_SIZE_MB:
-        # Need to split audio
-        return _transcribe_long_audio(audio_path, url, language)
-    else:
-        # Direct transcription
-        if stream:
-            return _transcribe_streaming(audio_path, url, language)
+    audio = AudioFile.from_path(audio_path)
+    console.print(f"[dim]Audio file size: {audio.size_mb:.1f} MB[/dim]")
+
+    # Reuse an earlier transcription of the same audio
+    with open(audio.path, "rb") as f:
+        digest = hashlib.file_digest(f, "sha256").hexdigest()
+    cache_path = _asr_cache_path(digest, language)
+    segments = _read_asr_cache(cache_path)
+    if segments is not None:
+        console.print("[bold green]Using cached transcription[/bold green]")
+        return segments
+
+    # One keep-alive connection pool for every request in this transcription
+    pool_size = max(1, concurrency)
+    limits = httpx.Limits(
+        max_connections=pool_size, max_keepalive_connections=pool_size
+    )
+    with httpx.Client(timeout=REQUEST_TIMEOUT, limits=limits) as client:
+        if audio.size_mb > MAX_FILE_SIZE_MB:
+            # Need to split audio
+            segments = _transcribe_long_audio(client, audio, url, language, concurrency)
         else:
-            return _transcribe_non_streaming(audio_path, url, language)
+            # Direct transcription
+            if stream:
+                segments = _transcribe_streaming(client, audio, url, language)
+            else:
+                segments = _transcribe_non_streaming(client, audio, url, language)
+
+    if any(seg["text"] for seg in segments):
+        write_cache(cache_path, orjson.dumps(segments))
+    return segments
+
 
+def _transcribe_long_audio(
+    client: httpx.Client, audio: AudioFile, url: str, language: str, concurrency: int
+) -> list[dict]:
+    """Transcribe long audio by splitting into segments.
 
-def _transcribe_long_audio(audio_path: str, url: str, language: str) -> list[dict]:
-    """Transcribe long audio by splitting into segments."""
-    segment_files = _split_audio(audio_path)
+    Splitting and transcription run as a pipeline: each segment is encoded
+    by ffmpeg straight into memory and handed to the upload pool, while the
+    next one is being cut. At most concurrency + 1 encoded segments are held
+    at once, and nothing is written to disk. Both phases report to a single
+    Progress display.
+    """
+    # One slot per encoded segment beyond the one currently being cut
+    slots = threading.Semaphore(max(1, concurrency))
+    failed = threading.Event()
 
-    all_segments = []
+    def transcribe_segment(name: str, content: bytes) -> list[dict]:
+        try:
+            # Segments are cached too, so a rerun after a failed upload
+            # only sends the segments that did not finish
+            cache_path = _asr_cache_path(hashlib.sha256(content).hexdigest(), language)
+            segments = _read_asr_cache(cache_path)
+            if segments is None:
+                segments = _post_audio(client, url, name, content, language)
+                write_cache(cache_path, orjson.dumps(segments))
+            return segments
+        except BaseException:
+            failed.set()
+            raise
+        finally:
+            slots.release()
+
+    futures = []
 
     with Progress(
         SpinnerColumn(),
@@ -147,39 +265,66 @@ def _transcribe_long_audio(audio_path: str, url: str, language: str) -> list[dic
         TaskProgressColumn(),
         console=console,
     ) as progress:
-        task = progress.add_task("Transcribing segments", total=len(segment_files))
-
-        for segment_file in segment_files:
-            # Transcribe segment
-            segments = _transcribe_non_streaming(segment_file, url, language, show_progress=False)
-            all_segments.extend(segments)
-
-            # Clean up temp file
-            os.remove(segment_file)
-
-            progress.update(task, advance=1)
-
-    # Clean up temp directory
-    if segment_files:
-        temp_dir = os.path.dirname(segment_files[0])
-        try:
-            os.rmdir(temp_dir)
-        except OSError:
-            pass
+        split_task = progress.add_task("Splitting audio", total=None)
+        task = progress.add_task("Transcribing segments", total=None)
+
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            try:
+                for name, content in _split_audio(audio.path, progress, split_task):
+                    future = executor.submit(transcribe_segment, name, content)
+                    future.add_done_callback(
+                        lambda _: progress.update(task, advance=1)
+                    )
+                    futures.append(future)
+                    progress.update(task, total=len(futures))
+
+                    # Stop cutting segments once an upload has failed, and
+                    # wait for a free slot before encoding the next one
+                    if failed.is_set():
+                        break
+                    slots.acquire()
+
+                # Collect in submission order to keep the transcript chronological
+                results = [future.result() for future in futures]
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
 
     # Combine all text into one segment
-    full_text = "".join(seg["text"] for seg in all_segments)
+    full_text = "".join(seg["text"] for segments in results for seg in segments)
     console.print(
         f"[bold green]Transcription complete: {len(full_text)} characters[/bold green]"
     )
     return [{"start": 0, "end": 0, "text": full_text}]
 
 
-def _transcribe_streaming(audio_path: str, url: str, language: str) -> list[dict]:
+def _iter_sse_data(response: httpx.Response) -> Iterator[bytes]:
+    """Yield the payload of each "data:" line of a server-sent event stream.
+
+    Lines are split out of the raw decoded bytes as they arrive, so blank
+    separators and other SSE fields are skipped without decoding them.
+    """
+    buf = bytearray()
+    for chunk in response.iter_bytes():
+        buf += chunk
+        start = 0
+        while (nl := buf.find(b"\n", start)) != -1:
+            if buf.startswith(b"data: ", start, nl):
+                yield bytes(buf[start + 6:nl]).rstrip(b"\r")
+            start = nl + 1
+        del buf[:start]
+    if buf.startswith(b"data: "):
+        yield bytes(buf[6:]).rstrip(b"\r")
+
+
+def _transcribe_streaming(
+    client: httpx.Client, audio: AudioFile, url: str, language: str
+) -> list[dict]:
     """Transcribe with streaming output for real-time progress."""
     try:
-        with open(audio_path, "rb") as f:
-            files = {"file": (Path(audio_path).name, f)}
+        with open(audio.path, "rb") as f:
+            files = {"file": (audio.name, f)}
             data = {
                 "model": QWEN_ASR_MODEL,
                 "language": language,
@@ -187,46 +332,84 @@ def _transcribe_streaming(audio_path: str, url: str, language: str) -> list[dict
                 "stream": "true",
             }
 
-            full_text = ""
-            with httpx.stream(
-                "POST", url, files=files, data=data, timeout=600
-            ) as response:
+            # Deltas are collected and joined once at the end
+            parts: list[str] = []
+            # Whether the <asr_text> tag has arrived, and the tail of the
+            # text before it in case the tag is split across deltas
+            tag_found = False
+            carry = ""
+            # Start of the transcript, for the live display
+            preview = ""
+            with client.stream("POST", url, files=files, data=data) as response:
                 response.raise_for_status()
 
-                # Use Rich Live for real-time display
-                with Live(Text(""), console=console, refresh_per_second=10) as live:
-                    for line in response.iter_lines():
-                        if line.startswith("data: "):
-                            data_str = line[6:]
-                            if data_str == "[DONE]":
-                                break
-
-                            try:
-                                chunk = json.loads(data_str)
-                                if "choices" in chunk and chunk["choices"]:
-                                    delta = chunk["choices"][0].get("delta", {})
-                                    content = delta.get("content", "")
-                                    if content:
-                                        full_text += content
-                                        # Show cleaned text in real-time
-                                        display_text = _clean_text(full_text)
-                                        if display_text:
-                                            live.update(
-                                                Text(f"  {display_text[:100]}...", style="dim")
-                                                if len(display_text) > 100
-                                                else Text(f"  {display_text}", style="dim")
-                                            )
-                            except json.JSONDecodeError:
-                                continue
+                # Use Rich Live for real-time display; the one Text object is
+                # updated in place and picked up by Live's auto-refresh
+                last_update = 0.0
+                live_text = Text("", style="dim")
+                with Live(
+                    live_text, console=console, refresh_per_second=_PREVIEW_RATE
+                ) as live:
+                    for line in _iter_sse_data(response):
+                        if line == b"[DONE]":
+                            break
+
+                        # Every delta is a JSON object; skip pings and
+                        # fragments without paying for a parse attempt
+                        if not line.endswith((b"}", b"]")):
+                            continue
+                        try:
+                            chunk = orjson.loads(line)
+                        except orjson.JSONDecodeError:
+                            continue
+
+                        if not chunk.get("choices"):
+                            continue
+                        delta = chunk["choices"][0].get("delta", {})
+                        content = delta.get("content", "")
+                        if not content:
+                            continue
+                        parts.append(content)
+
+                        # Only look for the tag in the newly received text
+                        if not tag_found:
+                            window = carry + content
+                            _, tag, tail = window.partition(_ASR_TAG)
+                            if tag:
+                                tag_found = True
+                                preview = tail
+                            else:
+                                carry = window[-(len(_ASR_TAG) - 1):]
+                                preview = (preview + content)[:2 * _PREVIEW_CHARS]
+                        elif len(preview) < 2 * _PREVIEW_CHARS:
+                            preview += content
+
+                        # Debounce the display to the Live refresh rate
+                        now = time.monotonic()
+                        if now - last_update < 1 / _PREVIEW_RATE:
+                            continue
+                        last_update = now
+
+                        # Show cleaned text in real-time, once it changes
+                        display_text = _preview_line(preview)
+                        if display_text and display_text != live_text.plain:
+                            live_text.plain = display_text
+
+                    # The debounce may have skipped the last deltas, so
+                    # leave the final text on screen
+                    text = _clean_text("".join(parts))
+                    display_text = _preview_line(text)
+                    if display_text:
+                        live_text.plain = display_text
+                        live.update(live_text, refresh=True)
 
     except httpx.ConnectError:
         raise ValueError(f"Cannot connect to Qwen ASR at {url}")
     except httpx.TimeoutException:
         raise ValueError("Qwen ASR request timed out")
     except httpx.HTTPStatusError as e:
-        raise ValueError(f"Qwen ASR error: {e.response.status_code}")
+        raise _status_error(e)
 
-    text = _clean_text(full_text)
     segments = [{"start": 0, "end": 0, "text": text}]
 
     console.print(
@@ -235,32 +418,45 @@ def _transcribe_streaming(audio_path: str, url: str, language: str) -> list[dict
     return segments
 
 
-def _transcribe_non_streaming(
-    audio_path: str, url: str, language: str, show_progress: bool = True
+def _post_audio(
+    client: httpx.Client,
+    url: str,
+    filename: str,
+    content: BinaryIO | bytes,
+    language: str,
 ) -> list[dict]:
-    """Transcribe without streaming (simpler, same speed for short audio)."""
-    try:
-        with open(audio_path, "rb") as f:
-            files = {"file": (Path(audio_path).name, f)}
-            data = {
-                "language": language,
-                "response_format": "json",
-            }
-            response = httpx.post(url, files=files, data=data, timeout=600)
+    """Upload audio (an open file or encoded bytes) and parse the transcription."""
+    files = {"file": (filename, content)}
+    data = {
+        "language": language,
+        "response_format": "json",
+    }
 
+    try:
+        response = client.post(url, files=files, data=data)
         response.raise_for_status()
     except httpx.ConnectError:
         raise ValueError(f"Cannot connect to Qwen ASR at {url}")
     except httpx.TimeoutException:
         raise ValueError("Qwen ASR request timed out")
     except httpx.HTTPStatusError as e:
-        raise ValueError(f"Qwen ASR error: {e.response.status_code}")
+        raise _status_error(e)
 
-    result = response.json()
-    segments = _parse_response(result)
+    result = orjson.loads(response.content)
+    return _parse_response(result)
 
-    if show_progress:
-        console.print(
-            f"[bold green]Transcription complete: {len(segments)} segments[/bold green]"
-        )
+
+def _transcribe_non_streaming(
+    client: httpx.Client,
+    audio: AudioFile,
+    url: str,
+    language: str,
+) -> list[dict]:
+    """Transcribe without streaming (simpler, same speed for short audio)."""
+    with open(audio.path, "rb") as f:
+        segments = _post_audio(client, url, audio.name, f, language)
+
+    console.print(
+        f"[bold green]Transcription complete: {len(segments)} segments[/bold green]"
+    )
     return segments
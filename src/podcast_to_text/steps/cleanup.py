@@ -12,9 +12,7 @@ class CleanupStep:
 
     name = "Cleanup"
 
-    def run(self, ctx: PipelineContext) -> PipelineContext:
+    def run(self, ctx: PipelineContext) -> None:
         if not ctx.config.keep_audio and ctx.audio_path and ctx.audio_path.exists():
             ctx.audio_path.unlink()
             console.print("[dim]Audio file cleaned up[/dim]")
-
-        return ctx
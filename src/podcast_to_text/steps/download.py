@@ -12,7 +12,7 @@ class DownloadStep:
 
     name = "Download"
 
-    def run(self, ctx: PipelineContext) -> PipelineContext:
+    def run(self, ctx: PipelineContext) -> None:
         if not ctx.source_url:
             raise ValueError("source_url is required for DownloadStep")
 
@@ -23,4 +23,3 @@ class DownloadStep:
 
         ctx.audio_path = Path(audio_path)
         ctx.episode_title = title
-        return ctx
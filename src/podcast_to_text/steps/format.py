@@ -10,7 +10,7 @@ class FormatStep:
 
     name = "Format"
 
-    def run(self, ctx: PipelineContext) -> PipelineContext:
+    def run(self, ctx: PipelineContext) -> None:
         ctx.config.require_openai()
 
         if ctx.segments:
@@ -20,6 +20,7 @@ class FormatStep:
                 ctx.config.openai_endpoint,
                 ctx.config.openai_key,
                 ctx.config.openai_deployment,
+                ctx.config.openai_concurrency,
             )
         elif ctx.text_path:
             # Format from text file
@@ -29,6 +30,7 @@ class FormatStep:
                 ctx.config.openai_endpoint,
                 ctx.config.openai_key,
                 ctx.config.openai_deployment,
+                ctx.config.openai_concurrency,
             )
             # Set title from text filename if not already set
             if not ctx.episode_title:
@@ -36,22 +38,18 @@ class FormatStep:
         else:
             raise ValueError("segments or text_path required for FormatStep")
 
-        return ctx
-
 
 class SkipFormatStep:
     """Skip formatting, just convert segments to text."""
 
     name = "Skip Format"
 
-    def run(self, ctx: PipelineContext) -> PipelineContext:
+    def run(self, ctx: PipelineContext) -> None:
         if ctx.segments:
             ctx.text = segments_to_text(ctx.segments)
         elif ctx.text_path:
-            ctx.text = ctx.text_path.read_text(encoding="utf-8")
+            # Leave ctx.text unset: SaveStep copies the file as-is
             if not ctx.episode_title:
                 ctx.episode_title = ctx.text_path.stem
         else:
             raise ValueError("segments or text_path required")
-
-        return ctx
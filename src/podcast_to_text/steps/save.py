@@ -1,6 +1,6 @@
 """Save step for pipeline."""
 
-import re
+import shutil
 from datetime import datetime
 from pathlib import Path
 
@@ -10,11 +10,13 @@ from ..pipeline import PipelineContext
 
 console = Console()
 
+# Characters not allowed in filenames on common filesystems, mapped to "_"
+_INVALID_FN_CHARS = str.maketrans(dict.fromkeys('<>:"/\\|?*', "_"))
+
 
 def sanitize_filename(title: str) -> str:
     """Sanitize title for use as filename."""
-    safe = re.sub(r'[<>:"/\\|?*]', "_", title)
-    return safe[:100].strip()
+    return title.translate(_INVALID_FN_CHARS)[:100].strip()
 
 
 class SaveStep:
@@ -22,8 +24,10 @@ class SaveStep:
 
     name = "Save"
 
-    def run(self, ctx: PipelineContext) -> PipelineContext:
-        if not ctx.text:
+    def run(self, ctx: PipelineContext) -> None:
+        # An unformatted text file is passed through as text_path alone
+        passthrough = ctx.text is None and ctx.text_path is not None
+        if not ctx.text and not passthrough:
             raise ValueError("text is required for SaveStep")
 
         # Ensure output directory exists
@@ -37,10 +41,19 @@ class SaveStep:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             output_file = ctx.config.output_dir / f"podcast_{timestamp}.md"
 
-        # Write output
-        output_file.write_text(ctx.text, encoding="utf-8")
+        # Write to a temp file and rename it into place, so an interrupted
+        # run never leaves a truncated output; a passthrough file is copied
+        # without decoding
+        tmp_file = output_file.with_name(f"{output_file.name}.tmp")
+        try:
+            if passthrough:
+                shutil.copyfile(ctx.text_path, tmp_file)
+            else:
+                tmp_file.write_bytes(ctx.text.encode("utf-8"))
+            tmp_file.replace(output_file)
+        except BaseException:
+            tmp_file.unlink(missing_ok=True)
+            raise
         ctx.output_path = output_file
 
         console.print(f"[bold green]Saved to:[/bold green] {output_file}")
-
-        return ctx
@@ -8,26 +8,28 @@ class TranscribeStep:
 
     name = "Transcribe"
 
-    def run(self, ctx: PipelineContext) -> PipelineContext:
+    def run(self, ctx: PipelineContext) -> None:
         ctx.config.require_speech()
 
         if not ctx.audio_path:
             raise ValueError("audio_path is required for TranscribeStep")
 
         if ctx.config.asr_provider == "qwen":
-            from ..qwen_transcriber import transcribe_audio_qwen
+            from ..qwen_transcriber import DEFAULT_CONCURRENCY, transcribe_audio_qwen
 
             segments = transcribe_audio_qwen(
                 str(ctx.audio_path),
                 ctx.config.qwen_asr_url,
+                concurrency=ctx.config.asr_concurrency or DEFAULT_CONCURRENCY,
             )
         else:  # azure (default)
-            from ..transcriber import transcribe_audio
+            from ..transcriber import DEFAULT_CONCURRENCY, transcribe_audio
 
             segments = transcribe_audio(
                 str(ctx.audio_path),
                 ctx.config.speech_key,
                 ctx.config.speech_region,
+                concurrency=ctx.config.asr_concurrency or DEFAULT_CONCURRENCY,
             )
 
         if not segments:
@@ -38,5 +40,3 @@ class TranscribeStep:
         # Set title from audio filename if not already set
         if not ctx.episode_title:
             ctx.episode_title = ctx.audio_path.stem
-
-        return ctx
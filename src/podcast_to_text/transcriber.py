@@ -1,90 +1,106 @@
 """Audio transcription using Azure Speech SDK."""
 
-import os
-import tempfile
-import time
-from pathlib import Path
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+from typing import TYPE_CHECKING
 
-import azure.cognitiveservices.speech as speechsdk
-from pydub import AudioSegment
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn
 
+from .audio import iter_segment, probe_duration_ms
+
+# The Speech SDK loads native libraries on import, so it is only imported
+# once Azure transcription actually runs
+if TYPE_CHECKING:
+    import azure.cognitiveservices.speech as speechsdk
+
 console = Console()
 
 # 15 minutes in milliseconds
 SEGMENT_DURATION_MS = 15 * 60 * 1000
 
+# Default number of segments transcribed in parallel. The free F0 tier of
+# Azure Speech allows a single concurrent recognition, so stay sequential
+# unless ASR_CONCURRENCY raises it.
+DEFAULT_CONCURRENCY = 1
 
-def split_audio(audio_path: str, segment_duration_ms: int = SEGMENT_DURATION_MS) -> list[str]:
-    """
-    Split long audio into segments using pydub.
-
-    Args:
-        audio_path: Path to the audio file
-        segment_duration_ms: Duration of each segment in milliseconds
-
-    Returns:
-        List of paths to temporary segment files
-    """
-    console.print("[bold blue]Splitting audio into segments...[/bold blue]")
+# Text of a transcription segment
+_get_text = itemgetter("text")
 
-    audio = AudioSegment.from_file(audio_path)
-    total_duration = len(audio)
-    segments = []
+# Raw PCM fed to the Speech SDK (16 kHz, 16-bit, mono)
+PCM_SAMPLE_RATE = 16000
+PCM_CODEC_ARGS = ["-ac", "1", "-ar", str(PCM_SAMPLE_RATE), "-c:a", "pcm_s16le", "-f", "s16le"]
 
-    temp_dir = tempfile.mkdtemp(prefix="podcast_segments_")
 
-    num_segments = (total_duration + segment_duration_ms - 1) // segment_duration_ms
+@functools.lru_cache(maxsize=4)
+def _get_speech_config(speech_key: str, speech_region: str) -> "speechsdk.SpeechConfig":
+    """Build the Speech SDK config once per key and region."""
+    import azure.cognitiveservices.speech as speechsdk
 
-    with Progress(
-        SpinnerColumn(),
-        TextColumn("[progress.description]{task.description}"),
-        BarColumn(),
-        TaskProgressColumn(),
-        console=console,
-    ) as progress:
-        task = progress.add_task("Splitting audio", total=num_segments)
+    speech_config = speechsdk.SpeechConfig(subscription=speech_key, region=speech_region)
+    speech_config.speech_recognition_language = "zh-CN"
 
-        for i, start in enumerate(range(0, total_duration, segment_duration_ms)):
-            end = min(start + segment_duration_ms, total_duration)
-            segment = audio[start:end]
+    # Enable detailed output with timing
+    speech_config.output_format = speechsdk.OutputFormat.Detailed
+    return speech_config
 
-            segment_path = os.path.join(temp_dir, f"segment_{i:04d}.wav")
-            segment.export(segment_path, format="wav")
-            segments.append(segment_path)
 
-            progress.update(task, advance=1)
+def _cancellation_error(details: "speechsdk.CancellationDetails") -> ValueError:
+    """Convert a recognition canceled by the Speech service into a ValueError."""
+    import azure.cognitiveservices.speech as speechsdk
 
-    console.print(f"[bold green]Split into {len(segments)} segments[/bold green]")
-    return segments
+    if details.code == speechsdk.CancellationErrorCode.TooManyRequests:
+        return ValueError(
+            "Azure Speech rate limited the request (TooManyRequests); lower "
+            "ASR_CONCURRENCY (the free F0 tier allows 1 concurrent request)"
+        )
+    return ValueError(f"Azure Speech error: {details.error_details}")
 
 
-def transcribe_segment(segment_path: str, speech_key: str, speech_region: str) -> list[dict]:
+def transcribe_segment(
+    audio_path: str,
+    speech_key: str,
+    speech_region: str,
+    start_ms: int = 0,
+    duration_ms: int | None = None,
+) -> list[dict]:
     """
     Transcribe a single audio segment using Azure Speech SDK Continuous Recognition.
 
+    The segment is decoded by ffmpeg to raw PCM and pushed straight into
+    the recognizer's input stream, so nothing is written to disk and any
+    format ffmpeg can read is accepted.
+
     Args:
-        segment_path: Path to the audio segment
+        audio_path: Path to the audio file
         speech_key: Azure Speech API key
         speech_region: Azure Speech region
+        start_ms: Segment start in milliseconds
+        duration_ms: Segment duration in milliseconds, or None for the rest
+            of the file
 
     Returns:
-        List of transcription results with timestamps
+        List of transcription results with timestamps relative to start_ms
     """
-    speech_config = speechsdk.SpeechConfig(subscription=speech_key, region=speech_region)
-    speech_config.speech_recognition_language = "zh-CN"
+    import azure.cognitiveservices.speech as speechsdk
 
-    # Enable detailed output with timing
-    speech_config.output_format = speechsdk.OutputFormat.Detailed
+    speech_config = _get_speech_config(speech_key, speech_region)
 
-    audio_config = speechsdk.AudioConfig(filename=segment_path)
+    stream = speechsdk.audio.PushAudioInputStream(
+        speechsdk.audio.AudioStreamFormat(
+            samples_per_second=PCM_SAMPLE_RATE, bits_per_sample=16, channels=1
+        )
+    )
+    audio_config = speechsdk.audio.AudioConfig(stream=stream)
     speech_recognizer = speechsdk.SpeechRecognizer(
         speech_config=speech_config, audio_config=audio_config
     )
 
     results = []
-    done = False
+    errors = []
+    done = threading.Event()
 
     def recognized_callback(evt):
         if evt.result.reason == speechsdk.ResultReason.RecognizedSpeech:
@@ -101,24 +117,55 @@ def transcribe_segment(segment_path: str, speech_key: str, speech_region: str) -
             })
 
     def stopped_callback(evt):
-        nonlocal done
-        done = True
+        done.set()
+
+    def canceled_callback(evt):
+        # End of stream also cancels the session; only errors are failures.
+        # Exceptions here are swallowed by the SDK's thread, so always wake
+        # the waiting worker.
+        try:
+            details = evt.cancellation_details
+            if details.reason == speechsdk.CancellationReason.Error:
+                errors.append(_cancellation_error(details))
+        finally:
+            done.set()
 
     speech_recognizer.recognized.connect(recognized_callback)
     speech_recognizer.session_stopped.connect(stopped_callback)
-    speech_recognizer.canceled.connect(stopped_callback)
+    speech_recognizer.canceled.connect(canceled_callback)
 
     speech_recognizer.start_continuous_recognition()
 
-    while not done:
-        time.sleep(0.5)
-
-    speech_recognizer.stop_continuous_recognition()
+    try:
+        chunks = iter_segment(audio_path, start_ms, duration_ms, PCM_CODEC_ARGS)
+        try:
+            for chunk in chunks:
+                # Stop decoding if the session was canceled early
+                if done.is_set():
+                    break
+                stream.write(chunk)
+        finally:
+            chunks.close()
+            # Closing the stream signals end of audio, which ends the session
+            stream.close()
+
+        done.wait()
+    finally:
+        # Also runs if ffmpeg fails mid-feed, so no recognizer is left running
+        speech_recognizer.stop_continuous_recognition()
+
+    if errors:
+        raise errors[0]
 
     return results
 
 
-def transcribe_audio(audio_path: str, speech_key: str, speech_region: str) -> list[dict]:
+def transcribe_audio(
+    audio_path: str,
+    speech_key: str,
+    speech_region: str,
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> list[dict]:
     """
     Transcribe audio file, handling long audio by splitting into segments.
 
@@ -126,14 +173,14 @@ def transcribe_audio(audio_path: str, speech_key: str, speech_region: str) -> li
         audio_path: Path to the audio file
         speech_key: Azure Speech API key
         speech_region: Azure Speech region
+        concurrency: Maximum number of segments transcribed in parallel
 
     Returns:
         List of transcription segments with timestamps:
         [{"start": 0.0, "end": 5.2, "text": "..."}, ...]
     """
     # Check audio duration to decide if splitting is needed
-    audio = AudioSegment.from_file(audio_path)
-    duration_ms = len(audio)
+    duration_ms = probe_duration_ms(audio_path)
     duration_minutes = duration_ms / 60000
 
     console.print(f"[bold]Audio duration:[/bold] {duration_minutes:.1f} minutes")
@@ -145,11 +192,22 @@ def transcribe_audio(audio_path: str, speech_key: str, speech_region: str) -> li
         console.print(f"[bold green]Transcription complete: {len(segments)} segments[/bold green]")
         return segments
 
-    # Long audio, split and process
-    segment_files = split_audio(audio_path)
+    def transcribe_range(start_ms: int) -> list[dict]:
+        segment_results = transcribe_segment(
+            audio_path, speech_key, speech_region, start_ms, SEGMENT_DURATION_MS
+        )
+
+        # Adjust timestamps with the segment's offset
+        time_offset = start_ms / 1000.0
+        for result in segment_results:
+            result["start"] += time_offset
+            result["end"] += time_offset
+
+        return segment_results
 
-    all_results = []
-    time_offset = 0.0
+    # Long audio: each worker decodes its own time range with ffmpeg and
+    # streams it to the recognizer, so no segment files are needed
+    starts = range(0, duration_ms, SEGMENT_DURATION_MS)
 
     with Progress(
         SpinnerColumn(),
@@ -158,33 +216,26 @@ def transcribe_audio(audio_path: str, speech_key: str, speech_region: str) -> li
         TaskProgressColumn(),
         console=console,
     ) as progress:
-        task = progress.add_task("Transcribing segments", total=len(segment_files))
-
-        for segment_file in segment_files:
-            segment_results = transcribe_segment(segment_file, speech_key, speech_region)
-
-            # Adjust timestamps with offset
-            for result in segment_results:
-                result["start"] += time_offset
-                result["end"] += time_offset
-                all_results.append(result)
-
-            # Get segment duration for next offset
-            seg_audio = AudioSegment.from_file(segment_file)
-            time_offset += len(seg_audio) / 1000.0
-
-            # Clean up temp file
-            os.remove(segment_file)
-
-            progress.update(task, advance=1)
-
-    # Clean up temp directory
-    if segment_files:
-        temp_dir = os.path.dirname(segment_files[0])
-        try:
-            os.rmdir(temp_dir)
-        except OSError:
-            pass
+        task = progress.add_task("Transcribing segments", total=len(starts))
+
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(starts)))) as executor:
+            futures = []
+            try:
+                for start_ms in starts:
+                    future = executor.submit(transcribe_range, start_ms)
+                    future.add_done_callback(
+                        lambda _: progress.update(task, advance=1)
+                    )
+                    futures.append(future)
+
+                # Collect in segment order to keep the transcript chronological
+                results = [future.result() for future in futures]
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
+    all_results = [result for segment_results in results for result in segment_results]
 
     console.print(f"[bold green]Transcription complete: {len(all_results)} segments[/bold green]")
     return all_results
@@ -192,4 +243,4 @@ def transcribe_audio(audio_path: str, speech_key: str, speech_region: str) -> li
 
 def segments_to_text(segments: list[dict]) -> str:
     """Convert transcription segments to plain text."""
-    return "".join(seg["text"] for seg in segments)
+    return "".join(map(_get_text, segments))